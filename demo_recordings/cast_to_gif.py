@@ -1,43 +1,390 @@
 #!/usr/bin/env python3
 
-import json
+import hashlib
+import mmap
 import os
+from multiprocessing import Pool
 import sys
 import shutil
-from PIL import Image, ImageDraw, ImageFont
+import numpy as np
+from PIL import Image, ImageFont
 import subprocess
-import tempfile
+from collections import deque
+from functools import lru_cache
 
-def create_terminal_image(text, width, height, font_size=18, bg_color=(25, 25, 35), fg_color=(220, 220, 220)):
-    """Create a terminal-like image with text."""
-    img = Image.new('RGB', (width, height), bg_color)
-    draw = ImageDraw.Draw(img)
+try:
+    # orjson decodes events in native code; fall back to the standard library
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Number of terminal lines kept and rendered
+TERMINAL_LINES = 30
+
+def scroll_offset(lines, prev_lines):
+    """Return how many lines the text scrolled up since prev_lines."""
+    # The last previous line may still have been growing, so leave it out
+    stable = prev_lines[:-1]
+    if lines[:len(stable)] == stable:
+        return 0
+    for offset in range(1, len(stable)):
+        if lines[:len(stable) - offset] == stable[offset:]:
+            return offset
+    return 0
+
+class GlyphAtlas:
+    """Pre-rendered glyph masks for a monospace font, laid out on a fixed grid."""
+    
+    def __init__(self, font, line_height):
+        self.font = font
+        self.char_width = max(1, round(font.getlength('M')))
+        
+        # Latin-1 is rendered up front; anything else is added on first use
+        latin1 = [chr(code) for code in range(256)]
+        
+        # Keep descenders that overhang the line, up to one extra line
+        bottom = font.getbbox(''.join(ch for ch in latin1 if ch.isprintable()))[3]
+        self.cell_height = min(max(line_height, bottom), 2 * line_height)
+        
+        self.index = {}
+        self.masks = np.zeros((0, self.cell_height, self.char_width), dtype=np.uint8)
+        self.add(latin1)
+    
+    def add(self, chars):
+        """Render masks for characters that are not in the atlas yet."""
+        chars = [ch for ch in chars if ch not in self.index]
+        masks = np.zeros((len(chars), self.cell_height, self.char_width), dtype=np.uint8)
+        for i, ch in enumerate(chars):
+            self.index[ch] = len(self.masks) + i
+            # Control characters are left blank
+            if not ch.isprintable():
+                continue
+            
+            # Rasterize the glyph straight to a mask and copy the part inside the cell
+            if hasattr(self.font, 'getmask2'):
+                mask, (x, y) = self.font.getmask2(ch, 'L')
+            else:
+                # Bitmap fonts have no glyph offsets
+                mask, (x, y) = self.font.getmask(ch, 'L'), (0, 0)
+            w, h = mask.size
+            glyph = np.asarray(mask, dtype=np.uint8).reshape(h, w)
+            top, left = max(0, y), max(0, x)
+            bottom, right = min(self.cell_height, y + h), min(self.char_width, x + w)
+            if top < bottom and left < right:
+                masks[i, top:bottom, left:right] = glyph[top - y:bottom - y, left - x:right - x]
+        self.masks = np.concatenate((self.masks, masks))
     
+    def render(self, line):
+        """Return the coverage mask of a line, cell_height rows high."""
+        missing = set(line).difference(self.index)
+        if missing:
+            self.add(missing)
+        codes = [self.index[ch] for ch in line]
+        # (chars, rows, cols) -> (rows, chars * cols)
+        return self.masks[codes].transpose(1, 0, 2).reshape(self.cell_height, -1)
+
+@lru_cache(maxsize=8)
+def load_font(font_size):
+    """Load the terminal font once per size."""
     try:
         # Try to load a monospace font
-        font = ImageFont.truetype("DejaVuSansMono.ttf", font_size)
+        return ImageFont.truetype("DejaVuSansMono.ttf", font_size)
     except IOError:
         # Fall back to default
-        font = ImageFont.load_default()
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=8)
+def glyph_atlas(font_size):
+    """Return the glyph atlas for a font size, built on first use."""
+    return GlyphAtlas(load_font(font_size), font_size + 2)
+
+@lru_cache(maxsize=8)
+def blended_palette(bg_color, fg_color):
+    """Return a 256-entry palette fading from bg_color to fg_color."""
+    alpha = np.arange(256, dtype=np.float32)[:, None] / 255
+    colors = np.asarray(bg_color, dtype=np.float32) * (1 - alpha) + np.asarray(fg_color, dtype=np.float32) * alpha
+    return np.rint(colors).astype(np.uint8).tobytes()
+
+def create_terminal_image(text, width, height, font_size=18, bg_color=(25, 25, 35), fg_color=(220, 220, 220),
+                          prev_frame=None):
+    """Create a terminal-like image with text.
     
+    The image is in palette mode, with each index a blend between the
+    background and foreground colours, so it can be written to a GIF
+    without quantizing it.
+    
+    Returns the image and a frame state. Passing that state back in as
+    prev_frame scrolls the previous frame to follow the text and only
+    redraws the lines that changed.
+    """
     # Calculate line height based on font
     line_height = font_size + 2
+    atlas = glyph_atlas(font_size)
+    
+    # Lines starting below the bottom edge are never drawn, and characters
+    # past the right edge are cut off
+    visible_lines = max(0, (height - 10 + line_height - 1) // line_height)
+    complete_lines = max(0, (height - 10) // line_height)
+    max_chars = max(0, (width - 10 + atlas.char_width - 1) // atlas.char_width)
     
-    # Split text into lines and draw each line
-    y_position = 10
     lines = text.split('\n')
-    for line in lines:
-        draw.text((10, y_position), line, font=font, fill=fg_color)
-        y_position += line_height
     
+    def line_at(i, rows):
+        return rows[i] if 0 <= i < len(rows) else ''
+    
+    def draw_line(coverage, i, top, bottom):
+        # Blend line i into the rows top..bottom of the coverage buffer
+        y = 10 + i * line_height
+        rows = slice(max(top, y), min(bottom, y + atlas.cell_height, height))
+        if rows.start >= rows.stop:
+            return
+        mask = atlas.render(line_at(i, lines)[:max_chars])
+        mask = mask[rows.start - y:rows.stop - y, :width - 10]
+        target = coverage[rows, 10:10 + mask.shape[1]]
+        np.maximum(target, mask, out=target)
+    
+    # Text coverage per pixel, 0 for background and 255 for foreground
+    if prev_frame is None:
+        coverage = np.zeros((height, width), dtype=np.uint8)
+        for i in range(min(len(lines), visible_lines)):
+            draw_line(coverage, i, 0, height)
+    else:
+        prev_lines, prev_coverage = prev_frame
+        dirty = set()
+        offset = scroll_offset(lines, prev_lines)
+        if offset:
+            # Move the previous frame up instead of redrawing every line
+            coverage = np.zeros((height, width), dtype=np.uint8)
+            top = 10 + offset * line_height
+            if top < height:
+                coverage[10:height - offset * line_height] = prev_coverage[top:]
+            prev_lines = prev_lines[offset:]
+            
+            # The top line loses the overhang of the line scrolled away, and
+            # lines that were cut off at the bottom have to be completed
+            dirty.add(0)
+            dirty.update(range(max(0, complete_lines - offset), visible_lines))
+        else:
+            coverage = prev_coverage.copy()
+        
+        # Descenders can overhang into the line below, so a changed line
+        # also dirties the band underneath it
+        for i in range(min(max(len(lines), len(prev_lines)), visible_lines)):
+            if line_at(i, lines) != line_at(i, prev_lines):
+                dirty.update((i, i + 1))
+        
+        # Redraw each dirty band from the line above it and its own line
+        for i in sorted(dirty):
+            if i >= visible_lines:
+                continue
+            top = 10 + i * line_height
+            coverage[top:top + line_height] = 0
+            draw_line(coverage, i - 1, top, top + line_height)
+            draw_line(coverage, i, top, top + line_height)
+    
+    # Use coverage as palette index into colours blended from background to foreground
+    img = Image.fromarray(coverage)
+    img.putpalette(blended_palette(tuple(bg_color), tuple(fg_color)))
+    
+    return img, (lines, coverage)
+
+def terminal_snapshots(events, fps):
+    """Replay output events and return a (terminal text, duration) list.
+    
+    At most one snapshot is taken per 1/fps seconds of recording; output
+    arriving faster than that is held back and saved at the end of its
+    interval.
+    Consecutive snapshots that leave the terminal unchanged are merged
+    into a single, longer one.
+    """
+    frame_duration = 1000 // fps  # in milliseconds
+    
+    # Finished lines (oldest drop off automatically) and the chunks of the
+    # line being written, joined only when a snapshot needs them
+    history = deque(maxlen=TERMINAL_LINES - 1)
+    current_line = []
+    texts = []
+    times = []
+    next_snapshot_time = 0
+    unsaved_output = False
+    
+    def add_snapshot(time):
+        # Keep the joined line so later snapshots only join what is new
+        current_line[:] = [''.join(current_line)]
+        texts.append('\n'.join((*history, current_line[0])))
+        times.append(time)
+    
+    for event in events:
+        # Only process output events (type 'o')
+        if event[1] == 'o':
+            output = event[2]
+            
+            # Output held back from the last interval closes that interval
+            if unsaved_output and event[0] >= next_snapshot_time:
+                add_snapshot(next_snapshot_time)
+                next_snapshot_time += 1.0 / fps
+                unsaved_output = False
+            
+            # Simple terminal emulation (just append output)
+            first, *rest = output.split('\n')
+            current_line.append(first)
+            if rest:
+                history.append(''.join(current_line))
+                history.extend(rest[:-1])
+                current_line = [rest[-1]]
+            
+            if event[0] >= next_snapshot_time:
+                add_snapshot(event[0])
+                next_snapshot_time = event[0] + 1.0 / fps
+                unsaved_output = False
+            else:
+                unsaved_output = True
+    
+    if unsaved_output:
+        add_snapshot(next_snapshot_time)
+    
+    # Ensure we have at least one frame
+    if not texts:
+        return [(''.join(current_line), frame_duration)]
+    
+    # Slow playback down based on the time since the previous snapshot
+    gaps = np.diff(np.fromiter(times, dtype=np.float64, count=len(times)), prepend=0)
+    repeats = np.clip((gaps * 3).astype(np.int32), 1, 5)
+    
+    snapshots = []
+    for text, repeat in zip(texts, repeats.tolist()):
+        duration = frame_duration * 3 * repeat
+        
+        # Extend the last snapshot if nothing visible changed
+        if snapshots and snapshots[-1][0] == text:
+            snapshots[-1][1] += duration
+        else:
+            snapshots.append([text, duration])
+    
+    return [tuple(snapshot) for snapshot in snapshots]
+
+# Per-process render state for the frame pool
+_worker_size = None
+_worker_frame = None
+
+def _init_worker(width, height):
+    global _worker_size, _worker_frame
+    _worker_size = (width, height)
+    _worker_frame = None
+
+def _render_snapshot(text):
+    """Render a snapshot, redrawing only what changed since this worker's last frame."""
+    global _worker_frame
+    img, _worker_frame = create_terminal_image(text, *_worker_size, prev_frame=_worker_frame)
     return img
 
+def render_frames(snapshots, width, height):
+    """Render snapshots across a process pool and yield (image, duration) in order."""
+    with Pool(initializer=_init_worker, initargs=(width, height)) as pool:
+        # Chunks keep neighbouring snapshots on one worker so they render incrementally
+        images = pool.imap(_render_snapshot, [text for text, _ in snapshots], chunksize=32)
+        for img, (_, duration) in zip(images, snapshots):
+            yield img, duration
+
+def encode_with_ffmpeg(frames, output_file, fps, frame_duration, width, height):
+    """Stream raw RGB frames to ffmpeg and encode them as a GIF or an H.264 MP4."""
+    if output_file.lower().endswith('.mp4'):
+        # yuv420p needs even dimensions but is what players expect
+        encode = [
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-crf', '23'
+        ]
+    else:
+        encode = [
+            '-filter_complex', 'split[a][b];[a]palettegen=stats_mode=diff[p];[b][p]paletteuse=dither=bayer',
+            '-loop', '0', '-f', 'gif'
+        ]
+    cmd = [
+        'ffmpeg', '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-video_size', f'{width}x{height}',
+        '-framerate', str(fps), '-i', '-',
+        *encode,
+        output_file
+    ]
+    ffmpeg_process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    
+    # ffmpeg reads frames at a constant rate, so longer frames are written repeatedly
+    frame_count = 0
+    try:
+        for img, duration in frames:
+            data = img.convert('RGB').tobytes()
+            for _ in range(max(1, duration // frame_duration)):
+                ffmpeg_process.stdin.write(data)
+            frame_count += 1
+        ffmpeg_process.stdin.close()
+    except BrokenPipeError:
+        # ffmpeg exited early and has printed why; its exit status is raised below
+        pass
+    if ffmpeg_process.wait() != 0:
+        raise subprocess.CalledProcessError(ffmpeg_process.returncode, cmd)
+    return frame_count
+
+def encode_with_pil(frames, output_file):
+    """Assemble frames into an APNG, or into a GIF when ffmpeg is not available."""
+    if output_file.lower().endswith(('.apng', '.png')):
+        # APNG compresses with zlib and keeps the frame palette as is
+        save_options = {'format': 'PNG'}
+    else:
+        save_options = {'format': 'GIF'}
+    frame_list = []
+    seen = {}
+    
+    # Keep the rendered frames in memory; a screen that comes back shares
+    # the image already held for it
+    for img, duration in frames:
+        digest = hashlib.blake2b(img.tobytes(), digest_size=16).digest()
+        frame_list.append((seen.setdefault(digest, img), duration))
+    
+    if frame_list:
+        first, *images = (img for img, _ in frame_list)
+        if save_options['format'] == 'GIF':
+            save_options['palette'] = first.palette
+        
+        # Save the animation
+        first.save(
+            output_file,
+            save_all=True,
+            append_images=images,
+            duration=[duration for _, duration in frame_list],
+            loop=0,
+            **save_options
+        )
+    return len(frame_list)
+
+def optimize_gif(output_gif):
+    """Recompress a GIF in place with gifsicle, if it is installed."""
+    if not shutil.which('gifsicle'):
+        return
+    
+    # gifsicle shares palettes and stores only the pixels that change between frames
+    try:
+        subprocess.run(['gifsicle', '--batch', '-O3', '--colors', '64', '--lossy=30', output_gif], check=True)
+    except subprocess.CalledProcessError:
+        # The GIF is already complete, so keep it unoptimized (--lossy needs gifsicle 1.92+)
+        print(f"Warning: gifsicle could not optimize {output_gif}")
+
 def asciinema_to_gif(cast_file, output_gif, fps=5, width=1000, height=600):
-    """Convert an asciinema .cast file to a GIF."""
-    # Read the cast file
-    with open(cast_file, 'r') as f:
+    """Convert an asciinema .cast file to a GIF, or to an APNG or MP4 by extension.
+    
+    Returns True if the output file was created.
+    """
+    # Anything that is not APNG or MP4 is written as a GIF
+    output_format = os.path.splitext(output_gif)[1].lower()
+    if output_format not in ('.apng', '.png', '.mp4'):
+        output_format = '.gif'
+    if output_format == '.mp4' and not shutil.which('ffmpeg'):
+        print(f"Error: ffmpeg is required to create {output_gif}")
+        return False
+    
+    # Map the file instead of reading it line by line through buffered I/O
+    with open(cast_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as cast:
         # Parse header (first line)
-        header = json.loads(f.readline())
+        header = json_loads(cast.readline())
         
         # Set terminal dimensions
         terminal_width = header.get('width', 80) * 8  # Approximate character width
@@ -48,79 +395,37 @@ def asciinema_to_gif(cast_file, output_gif, fps=5, width=1000, height=600):
         if terminal_height > height:
             terminal_height = height
         
-        # Initialize terminal state
-        terminal_content = ""
-        frames = []
         frame_duration = 1000 // fps  # in milliseconds
-        
-        # Create temp directory for frames
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            frame_count = 0
-            last_time = 0
-            
-            # Read events
-            for line in f:
-                event = json.loads(line)
-                time_diff = event[0] - last_time
-                last_time = event[0]
-                
-                # Only process output events (type 'o')
-                if event[1] == 'o':
-                    output = event[2]
-                    
-                    # Simple terminal emulation (just append output)
-                    terminal_content += output
-                    
-                    # Limit content to last 30 lines
-                    lines = terminal_content.split('\n')
-                    if len(lines) > 30:
-                        terminal_content = '\n'.join(lines[-30:])
-                    
-                    # Create frames with slower playback
-                    # Add repeated frames for slower motion
-                    img = create_terminal_image(terminal_content, terminal_width, terminal_height)
-                    frame_path = os.path.join(tmpdirname, f"frame_{frame_count:05d}.png")
-                    img.save(frame_path)
-                    
-                    # Adjust speed based on time difference
-                    repeat_frames = max(1, min(5, int(time_diff * 3)))
-                    for _ in range(repeat_frames):
-                        frames.append((frame_path, frame_duration * 3))
-                    
-                    frame_count += 1
-            
-            # Ensure we have at least one frame
-            if frame_count == 0:
-                img = create_terminal_image(terminal_content, terminal_width, terminal_height)
-                frame_path = os.path.join(tmpdirname, "frame_00000.png")
-                img.save(frame_path)
-                frames.append((frame_path, frame_duration))
-            
-            # Create GIF using the saved frames
-            if frames:
-                images = []
-                for frame_path, _ in frames:
-                    images.append(Image.open(frame_path))
-                
-                # Save as GIF
-                images[0].save(
-                    output_gif,
-                    save_all=True,
-                    append_images=images[1:],
-                    optimize=False,
-                    duration=[duration for _, duration in frames],
-                    loop=0
-                )
-                print(f"GIF created at {output_gif}")
-            else:
-                print("No frames were created.")
+        events = (json_loads(line) for line in iter(cast.readline, b''))
+        snapshots = terminal_snapshots(events, fps)
+    
+    frames = render_frames(snapshots, terminal_width, terminal_height)
+    
+    # APNG is written by Pillow and MP4 by ffmpeg; GIFs prefer ffmpeg and
+    # fall back to Pillow if it is not installed
+    if output_format in ('.apng', '.png'):
+        frame_count = encode_with_pil(frames, output_gif)
+    elif shutil.which('ffmpeg'):
+        frame_count = encode_with_ffmpeg(frames, output_gif, fps, frame_duration,
+                                         terminal_width, terminal_height)
+    else:
+        frame_count = encode_with_pil(frames, output_gif)
+    
+    if frame_count:
+        if output_format == '.gif':
+            optimize_gif(output_gif)
+        print(f"{output_format[1:].upper()} created at {output_gif}")
+        return True
+    print("No frames were created.")
+    return False
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print(f"Usage: {sys.argv[0]} input.cast output.gif")
+        print(f"Usage: {sys.argv[0]} input.cast output.gif|output.apng|output.mp4")
         sys.exit(1)
     
     cast_file = sys.argv[1]
     output_gif = sys.argv[2]
     
-    asciinema_to_gif(cast_file, output_gif)
+    if not asciinema_to_gif(cast_file, output_gif):
+        sys.exit(1)
@@ -6,8 +6,8 @@ import os
 import time
 import sys
 
-def print_colored(text, color):
-    """Print colored text."""
+def fmt(text, color):
+    """Return text wrapped in a colour escape, as one output line."""
     colors = {
         'blue': '\033[0;34m',
         'green': '\033[0;32m',
@@ -17,53 +17,67 @@ def print_colored(text, color):
         'magenta': '\033[0;35m',
         'reset': '\033[0m'
     }
-    print(f"{colors.get(color, '')}{text}{colors['reset']}")
+    return f"{colors.get(color, '')}{text}{colors['reset']}\n"
+
+def flush(buf):
+    """Write buffered lines to stdout in a single call."""
+    sys.stdout.write(''.join(buf))
+    sys.stdout.flush()
+    buf.clear()
 
 def main():
     """Main application function."""
-    print_colored("====================================", "blue")
-    print_colored("   SentientOS Demo Application      ", "blue")
-    print_colored("====================================", "blue")
+    # Output is collected and written out right before each pause
+    buf = []
+    buf.append(fmt("====================================", "blue"))
+    buf.append(fmt("   SentientOS Demo Application      ", "blue"))
+    buf.append(fmt("====================================", "blue"))
     
-    print_colored("\nInitializing application...", "yellow")
+    buf.append(fmt("\nInitializing application...", "yellow"))
+    flush(buf)
     time.sleep(1)
     
-    print_colored("\n[1/4] Testing SentientOS environment", "cyan")
-    print("- OS Environment: SentientOS WebAssembly Runtime")
-    print("- Application Mode: Demonstration")
-    print("- Security Context: Zero-Knowledge Verified")
+    buf.append(fmt("\n[1/4] Testing SentientOS environment", "cyan"))
+    buf.append("- OS Environment: SentientOS WebAssembly Runtime\n")
+    buf.append("- Application Mode: Demonstration\n")
+    buf.append("- Security Context: Zero-Knowledge Verified\n")
+    flush(buf)
     time.sleep(0.5)
-    print_colored("✓ Environment check passed", "green")
+    buf.append(fmt("✓ Environment check passed", "green"))
     
-    print_colored("\n[2/4] Simulating ZK-verification", "cyan")
-    print("Generating zero-knowledge proof...")
+    buf.append(fmt("\n[2/4] Simulating ZK-verification", "cyan"))
+    buf.append("Generating zero-knowledge proof...\n")
+    flush(buf)
     time.sleep(1)
-    print_colored("✓ Zero-knowledge proof verified", "green")
+    buf.append(fmt("✓ Zero-knowledge proof verified", "green"))
     
-    print_colored("\n[3/4] Accessing MatrixBox container features", "cyan")
-    print("- Memory-safe isolation active")
-    print("- Resource limitations enforced")
-    print("- Inter-process communication channels secured")
+    buf.append(fmt("\n[3/4] Accessing MatrixBox container features", "cyan"))
+    buf.append("- Memory-safe isolation active\n")
+    buf.append("- Resource limitations enforced\n")
+    buf.append("- Inter-process communication channels secured\n")
+    flush(buf)
     time.sleep(0.5)
-    print_colored("✓ Container features accessible", "green")
+    buf.append(fmt("✓ Container features accessible", "green"))
     
-    print_colored("\n[4/4] Running application logic", "cyan")
+    buf.append(fmt("\n[4/4] Running application logic", "cyan"))
     for i in range(5):
-        print(f"Processing data chunk {i+1}/5...")
+        buf.append(f"Processing data chunk {i+1}/5...\n")
+        flush(buf)
         time.sleep(0.3)
-    print_colored("✓ Application logic completed successfully", "green")
+    buf.append(fmt("✓ Application logic completed successfully", "green"))
     
-    print_colored("\nSentientOS Demo Application completed successfully!", "green")
-    print_colored("This demonstrates how applications run in the SentientOS environment", "yellow")
-    print("Key capabilities demonstrated:")
-    print("1. WebAssembly runtime integration")
-    print("2. Zero-knowledge verification")
-    print("3. Memory-safe containerization")
-    print("4. Resource management")
+    buf.append(fmt("\nSentientOS Demo Application completed successfully!", "green"))
+    buf.append(fmt("This demonstrates how applications run in the SentientOS environment", "yellow"))
+    buf.append("Key capabilities demonstrated:\n")
+    buf.append("1. WebAssembly runtime integration\n")
+    buf.append("2. Zero-knowledge verification\n")
+    buf.append("3. Memory-safe containerization\n")
+    buf.append("4. Resource management\n")
+    flush(buf)
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        print_colored("\nApplication terminated by user", "red")
+        sys.stdout.write(fmt("\nApplication terminated by user", "red"))
         sys.exit(1)